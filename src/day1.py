@@ -1,5 +1,9 @@
+import heapq
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
 from functools import cache
-from typing import AnyStr
+from typing import AnyStr, Iterable, Iterator, Optional
 
 
 @cache
@@ -14,12 +18,102 @@ def get_calories_per_elf() -> list[int]:
     return result
 
 
+def _iter_totals(chunks: Iterable[AnyStr], newline: AnyStr) -> Iterator[int]:
+    total, items = 0, 0
+    pending = newline[:0]
+    for chunk in chunks:
+        lines = (pending + chunk).split(newline)
+        pending = lines.pop()
+        for line in lines:
+            if line:
+                total += int(line)
+                items += 1
+            elif items:
+                yield total
+                total, items = 0, 0
+
+    if pending:
+        total += int(pending)
+        items += 1
+    if items:
+        yield total
+
+
+def iter_calories_per_elf(filename: str, chunk_size: int = 1 << 16) -> Iterator[int]:
+    with open(filename, "r") as fp:
+        yield from _iter_totals(iter(lambda: fp.read(chunk_size), ""), "\n")
+
+
+def top_calories(filename: str, k: int = 3) -> tuple[int, int, list[int]]:
+    heap: list[int] = []
+    if k <= 0:
+        return 0, 0, heap
+
+    for calories in iter_calories_per_elf(filename):
+        if len(heap) < k:
+            heapq.heappush(heap, calories)
+        elif calories > heap[0]:
+            heapq.heapreplace(heap, calories)
+
+    top = sorted(heap, reverse=True)
+    return (top[0] if top else 0), sum(top), top
+
+
+SHARD_SIZE = 1 << 26
+WINDOW_SIZE = 1 << 20
+
+
+def _shard_boundaries(filename: str, shard_size: int = SHARD_SIZE) -> list[tuple[int, int]]:
+    with open(filename, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if not size:
+            return []
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            result = []
+            start = 0
+            while start < size:
+                end = start + shard_size
+                if end < size:
+                    end = mm.find(b"\n\n", end)
+                    end = size if end == -1 else end + 2
+                else:
+                    end = size
+                result.append((start, end))
+                start = end
+            return result
+
+
+def _top_calories_in_shard(filename: str, start: int, end: int, k: int) -> list[int]:
+    # The shard is read through the mapping one bounded window at a time, so only a
+    # running elf total and the k largest totals are held.
+    with open(filename, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            windows = (mm[i:min(i + WINDOW_SIZE, end)] for i in range(start, end, WINDOW_SIZE))
+            return heapq.nlargest(k, _iter_totals(windows, b"\n"))
+
+
+def top_calories_parallel(
+    *filenames: str, k: int = 3, workers: Optional[int] = None, shard_size: int = SHARD_SIZE
+) -> tuple[int, int, list[int]]:
+    # Shards are sized independently of the worker count, so a large file yields many
+    # small tasks that keep the pool balanced.
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [
+            executor.submit(_top_calories_in_shard, filename, start, end, k)
+            for filename in filenames
+            for start, end in _shard_boundaries(filename, shard_size)
+        ]
+        top = heapq.nlargest(k, (i for future in futures for i in future.result()))
+
+    return (top[0] if top else 0), sum(top), top
+
+
 def puzzle_1() -> int:
     return max(get_calories_per_elf())
 
 
 def puzzle_2() -> int:
-    return sum(sorted(get_calories_per_elf())[-3:])
+    return sum(heapq.nlargest(3, get_calories_per_elf()))
 
 
 if __name__ == "__main__":
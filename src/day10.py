@@ -1,7 +1,10 @@
 from __future__ import annotations
 import abc
+from array import array
+from collections import deque
 from dataclasses import dataclass
-from typing import TypeVar
+from itertools import accumulate
+from typing import Iterable, TypeVar
 
 
 class AbstractInstruction(metaclass=abc.ABCMeta):
@@ -60,7 +63,7 @@ class ExecutionState:
     def __init__(self):
         self._cycle_count: int = 0
         self._cpu = CPU()
-        self._instruction_queue: list[IT] = []
+        self._instruction_queue: deque[IT] = deque()
 
     def __next__(self) -> ExecutionState:
         if not self._instruction_queue:
@@ -70,7 +73,7 @@ class ExecutionState:
         self._instruction_queue[0].execution_cycles -= 1
 
         if not self._instruction_queue[0].execution_cycles:
-            self._instruction_queue.pop(0).execute(self._cpu)
+            self._instruction_queue.popleft().execute(self._cpu)
 
         return self
 
@@ -90,23 +93,49 @@ class ExecutionState:
         self._instruction_queue.append(instruction)
 
 
-def puzzle1(filename: str) -> int:
-    result = 0
-    execution_state = ExecutionState.from_file(filename)
+class RegisterTrace:
 
-    while True:
-        register_value = execution_state.cpu.x
+    @classmethod
+    def from_file(cls, filename: str) -> RegisterTrace:
+        # One delta per cycle, applied at the end of that cycle: addx contributes a 0
+        # and then its value, noop a single 0.
+        deltas = array("q")
+        with open(filename, "r") as fp:
+            for line in fp:
+                if line.startswith("addx"):
+                    deltas.append(0)
+                    deltas.append(int(line.rsplit(" ", 1)[-1]))
+                elif line.startswith("noop"):
+                    deltas.append(0)
+        return cls(deltas)
+
+    def __init__(self, deltas: array):
+        # _x[cycle] is the register value during that (1-based) cycle.
+        self._x = array("q", [0])
+        self._x.extend(accumulate(deltas, initial=1))
+        del self._x[-1]
 
-        try:
-            execution_state = next(execution_state)
-        except StopIteration:
-            break
+    @property
+    def cycle_count(self) -> int:
+        return len(self._x) - 1
 
-        if execution_state.cycle_count in [20, 60, 100, 140, 180, 220]:
-            signal_strength = execution_state.cycle_count * register_value
-            result += signal_strength
+    def x(self, cycle: int) -> int:
+        if not 1 <= cycle <= self.cycle_count:
+            raise IndexError(f"Cycle {cycle} outside 1..{self.cycle_count}")
+        return self._x[cycle]
 
-    return result
+    def signal_strength(self, cycle: int) -> int:
+        return cycle * self.x(cycle)
+
+    def signal_strengths(self, cycles: Iterable[int]) -> int:
+        # Cycles the program never reaches contribute nothing.
+        last = self.cycle_count
+        return sum(cycle * self._x[cycle] for cycle in cycles if 1 <= cycle <= last)
+
+
+def puzzle1(filename: str) -> int:
+    trace = RegisterTrace.from_file(filename)
+    return trace.signal_strengths([20, 60, 100, 140, 180, 220])
 
 
 def puzzle2(filename: str):
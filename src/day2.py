@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import abc
-from functools import cache
+from collections import Counter
+from typing import Callable, Mapping
 
 
 class _RockPaperScissorsBase(metaclass=abc.ABCMeta):
@@ -86,7 +87,6 @@ class Game:
         self._b = b
 
     @property
-    @cache
     def score(self) -> int:
         result = self._b.score
 
@@ -99,6 +99,44 @@ class Game:
         return result
 
 
+LINES = tuple(f"{a} {b}" for a in "ABC" for b in "XYZ")
+
+
+def score_table(parse: Callable[[str], Game]) -> dict[str, int]:
+    return {line: parse(line).score for line in LINES}
+
+
+SCORES_PUZZLE1 = score_table(Game.parse_puzzle1)
+SCORES_PUZZLE2 = score_table(Game.parse_puzzle2)
+
+
+def histogram(filename: str) -> dict[str, int]:
+    counts = Counter()
+    with open(filename, "rb") as fp:
+        for line in fp:
+            counts[line.rstrip()] += 1
+    counts.pop(b"", None)
+
+    result = {line: counts.pop(line.encode(), 0) for line in LINES}
+    if counts:
+        raise ValueError(f"Unrecognised strategy guide lines: {sorted(counts)}")
+    return result
+
+
+def score_histogram(histogram_: Mapping[str, int], scores: Mapping[str, int]) -> int:
+    return sum(count * scores[line] for line, count in histogram_.items())
+
+
+def score_strategies(filename: str, *strategies: Mapping[str, int]) -> list[int]:
+    histogram_ = histogram(filename)
+    return [score_histogram(histogram_, scores) for scores in strategies]
+
+
+def puzzles(filename: str) -> tuple[int, int]:
+    result1, result2 = score_strategies(filename, SCORES_PUZZLE1, SCORES_PUZZLE2)
+    return result1, result2
+
+
 def puzzle1() -> int:
     result = 0
 
@@ -120,5 +158,5 @@ def puzzle2() -> int:
 
 
 if __name__ == "__main__":
-    print(puzzle1())
-    print(puzzle2())
+    for result in puzzles("../input/day2.txt"):
+        print(result)
@@ -1,33 +1,44 @@
 import string
-from collections import Counter
 from functools import reduce
+from operator import and_
+
+# Bit ``i`` of a rucksack mask is set when the item with priority ``i + 1`` is present.
+ITEM_BITS = {ord(c): 1 << i for i, c in enumerate(string.ascii_letters)}
+
+
+def to_mask(items: bytes) -> int:
+    result = 0
+    for item in items:
+        result |= ITEM_BITS[item]
+    return result
+
+
+def priority(mask: int) -> int:
+    return (mask & -mask).bit_length()
 
 
 def puzzle1(input_: str) -> int:
     result = 0
 
-    with open(input_, "r") as fp:
+    with open(input_, "rb") as fp:
         for line in fp:
-            length = len(line)
-            mid = length // 2
-            first, second = Counter(line[:mid]), Counter(line[mid:])
-            common = list(set(first).intersection(set(second)))[0]
-            result += string.ascii_letters.index(common) + 1
+            line = line.rstrip()
+            mid = len(line) // 2
+            result += priority(to_mask(line[:mid]) & to_mask(line[mid:]))
 
     return result
 
 
-def puzzle2(input_: str) -> int:
+def puzzle2(input_: str, group_size: int = 3) -> int:
     result = 0
 
-    with open(input_, "r") as fp:
+    with open(input_, "rb") as fp:
         group = []
-        for i, line in enumerate(fp, start=1):
-            group.append(set(line.rstrip()))
-            if i % 3:
+        for line in fp:
+            group.append(to_mask(line.rstrip()))
+            if len(group) < group_size:
                 continue
-            common = list(reduce(set.intersection, group))[0]
-            result += string.ascii_letters.index(common) + 1
+            result += priority(reduce(and_, group))
             group = []
 
     return result
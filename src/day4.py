@@ -1,34 +1,115 @@
-from functools import reduce
+from __future__ import annotations
 
+import re
+from array import array
+from typing import Iterable, Iterator
+
+PAIR_PATTERN = re.compile(r"(\d+)-(\d+),(\d+)-(\d+)")
 
-def puzzle1(input_: str):
-    count = 0
 
+def parse_input(input_: str) -> Iterator[tuple[int, int, int, int]]:
     with open(input_, "r") as fp:
         for line in fp:
-            ranges = []
-            for range_ in line.rstrip().split(","):
-                min_, max_ = [int(i) for i in range_.split("-")]
-                ranges.append(set(range(min_, max_ + 1)))
-            if reduce(set.intersection, ranges) in ranges:
-                count += 1
+            line = line.rstrip()
+            if not line:
+                continue
+            if not (match := PAIR_PATTERN.fullmatch(line)):
+                raise ValueError(f"Malformed assignment pair: {line!r}")
+            yield tuple(int(i) for i in match.groups())
 
-    return count
 
+# Flat N x 4 array of (min_a, max_a, min_b, max_b) rows.
+def parse_array(input_: str) -> array:
+    result = array("Q")
+    for pair in parse_input(input_):
+        result.extend(pair)
+    return result
 
-def puzzle2(input_: str):
-    count = 0
 
-    with open(input_, "r") as fp:
-        for line in fp:
-            ranges = []
-            for range_ in line.rstrip().split(","):
-                min_, max_ = [int(i) for i in range_.split("-")]
-                ranges.append(set(range(min_, max_ + 1)))
-            if reduce(set.intersection, ranges):
-                count += 1
-
-    return count
+def contains(min_a: int, max_a: int, min_b: int, max_b: int) -> bool:
+    return (min_a <= min_b and max_b <= max_a) or (min_b <= min_a and max_a <= max_b)
+
+
+def overlaps(min_a: int, max_a: int, min_b: int, max_b: int) -> bool:
+    return min_a <= max_b and min_b <= max_a
+
+
+class IntervalIndex:
+
+    # Assignments are sorted by start and stored as an implicit balanced tree: the node
+    # for the slice [lo, hi) sits at its midpoint and records the largest end beneath it.
+    # Queries return ids, the positions of the matching intervals in the input. from_file
+    # feeds each line's two ranges in turn, so there divmod(id, 2) gives (pair, side).
+
+    @classmethod
+    def from_file(cls, filename: str) -> IntervalIndex:
+        values = parse_array(filename)
+        return cls(zip(values[0::2], values[1::2]))
+
+    def __init__(self, intervals: Iterable[tuple[int, int]]):
+        order = sorted(enumerate(intervals), key=lambda item: item[1][0])
+        self._ids = array("Q", (i for i, __ in order))
+        self._starts = array("Q", (start for __, (start, __) in order))
+        self._ends = array("Q", (end for __, (__, end) in order))
+        self._max_ends = array("Q", self._ends)
+        if self._ids:
+            self._build(0, len(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _build(self, lo: int, hi: int) -> int:
+        mid = (lo + hi) // 2
+        result = self._ends[mid]
+        if lo < mid:
+            result = max(result, self._build(lo, mid))
+        if mid + 1 < hi:
+            result = max(result, self._build(mid + 1, hi))
+        self._max_ends[mid] = result
+        return result
+
+    def overlapping(self, min_: int, max_: int) -> list[int]:
+        result = []
+        stack = [(0, len(self._ids))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_ends[mid] < min_:
+                continue
+            stack.append((lo, mid))
+            if self._starts[mid] <= max_:
+                if min_ <= self._ends[mid]:
+                    result.append(self._ids[mid])
+                stack.append((mid + 1, hi))
+        return result
+
+    def covering(self, section: int) -> list[int]:
+        return self.overlapping(section, section)
+
+    def batch_overlapping(self, ranges: Iterable[tuple[int, int]]) -> list[list[int]]:
+        return [self.overlapping(min_, max_) for min_, max_ in ranges]
+
+    def batch_covering(self, sections: Iterable[int]) -> list[list[int]]:
+        return [self.covering(section) for section in sections]
+
+
+def puzzles(input_: str) -> tuple[int, int]:
+    values = parse_array(input_)
+    min_a, max_a, min_b, max_b = (values[i::4] for i in range(4))
+    return (
+        sum(map(contains, min_a, max_a, min_b, max_b)),
+        sum(map(overlaps, min_a, max_a, min_b, max_b)),
+    )
+
+
+def puzzle1(input_: str):
+    return sum(contains(*pair) for pair in parse_input(input_))
+
+
+def puzzle2(input_: str):
+    return sum(overlaps(*pair) for pair in parse_input(input_))
 
 
 if __name__ == "__main__":
@@ -1,4 +1,7 @@
 import re
+from array import array
+
+MOVE_PATTERN = re.compile(r"\d+")
 
 
 def parse_stacks(data: list[str]) -> list[list[str]]:
@@ -38,24 +41,64 @@ def parse_input(filename: str) -> tuple[list[list[str]], list[str]]:
     return stacks, moves
 
 
+def parse_moves(moves: list[str]) -> array:
+    return array("L", map(int, MOVE_PATTERN.findall("\n".join(moves))))
+
+
+def operate_crane(stacks: list[list[str]], moves: array, keep_order: bool) -> str:
+    for i in range(0, len(moves), 3):
+        count, src, dst = moves[i:i + 3]
+        src_stack = stacks[src - 1]
+        if count > len(src_stack):
+            raise ValueError(f"Cannot move {count} crates from stack {src} holding {len(src_stack)}")
+        if not count or src == dst:
+            continue
+        crates = src_stack[-count:]
+        del src_stack[-count:]
+        stacks[dst - 1].extend(crates if keep_order else reversed(crates))
+    return "".join([stack[-1] for stack in stacks if stack])
+
+
+def trace_tops(stacks: list[list[str]], moves: array, keep_order: bool) -> str:
+    heights = [len(stack) for stack in stacks]
+    for i in range(0, len(moves), 3):
+        count, src, dst = moves[i:i + 3]
+        if count > heights[src - 1]:
+            raise ValueError(f"Cannot move {count} crates from stack {src} holding {heights[src - 1]}")
+        heights[src - 1] -= count
+        heights[dst - 1] += count
+
+    result = []
+    for stack, height in enumerate(heights, start=1):
+        if not height:
+            continue
+        # Follow the crate at ``depth`` below the top of ``stack`` back to the start.
+        depth = 0
+        for i in range(len(moves) - 3, -1, -3):
+            count, src, dst = moves[i:i + 3]
+            if src == dst:
+                continue
+            if stack == dst:
+                if depth < count:
+                    stack = src
+                    if not keep_order:
+                        depth = count - 1 - depth
+                else:
+                    depth -= count
+            elif stack == src:
+                depth += count
+        result.append(stacks[stack - 1][-1 - depth])
+    return "".join(result)
+
+
 def puzzle1(input_: str) -> str:
     stacks, moves = parse_input(input_)
-    for line in moves:
-        count, src, dst = [int(i.group()) for i in re.finditer("\d+", line)]
-        for __ in range(count):
-            stacks[dst - 1].append(stacks[src - 1].pop())
-    return "".join([stack[-1] for stack in stacks])
+    return operate_crane(stacks, parse_moves(moves), keep_order=False)
 
 
 def puzzle2(input_: str) -> str:
     stacks, moves = parse_input(input_)
-    for line in moves:
-        count, src, dst = [int(i.group()) for i in re.finditer("\d+", line)]
-        buffer = []
-        for __ in range(count):
-            buffer.insert(0, stacks[src - 1].pop())
-        stacks[dst - 1].extend(buffer)
-    return "".join([stack[-1] for stack in stacks])
+    return operate_crane(stacks, parse_moves(moves), keep_order=True)
 
 
 if __name__ == "__main__":
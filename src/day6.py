@@ -1,19 +1,71 @@
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
 
 def parse_input(input_: str):
     with open(input_, "r") as fp:
         return fp.read()
 
 
+class MarkerDetector:
+
+    def __init__(self, window_sizes: Iterable[int]):
+        self._markers: dict[int, Optional[int]] = {size: None for size in window_sizes}
+        # The longest run of distinct characters ending at a position answers every
+        # window size at once: a window of size k ends there once that run reaches k.
+        self._pending = sorted(self._markers, reverse=True)
+        self._last_seen = {}
+        self._position = 0
+        self._start = 0
+
+    @property
+    def markers(self) -> dict[int, Optional[int]]:
+        return dict(self._markers)
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def feed(self, chunk: Union[bytes, str]) -> dict[int, int]:
+        result = {}
+        position, start = self._position, self._start
+        last_seen, pending = self._last_seen, self._pending
+        for char in chunk:
+            if not pending:
+                break
+            start = max(start, last_seen.get(char, -1) + 1)
+            last_seen[char] = position
+            position += 1
+            while pending and position - start >= pending[-1]:
+                result[pending.pop()] = position
+        self._position, self._start = position, start
+        self._markers.update(result)
+        return result
+
+
+def iter_markers(
+    stream: BinaryIO, window_sizes: Iterable[int], chunk_size: int = 1 << 12
+) -> Iterator[tuple[int, int]]:
+    detector = MarkerDetector(window_sizes)
+    while not detector.done and (chunk := stream.read(chunk_size)):
+        yield from detector.feed(chunk).items()
+
+
+def find_markers(input_: str, window_sizes: Iterable[int]) -> dict[int, Optional[int]]:
+    detector = MarkerDetector(window_sizes)
+    detector.feed(input_.rstrip())
+    return detector.markers
+
+
+def find_marker(input_: str, window_size: int) -> Optional[int]:
+    return find_markers(input_, [window_size])[window_size]
+
+
 def puzzle1(input_: str) -> int:
-    for i in range(4, len(input_.rstrip()) + 1):
-        if len(set(input_[i - 4:i])) == 4:
-            return i
+    return find_marker(input_, 4)
 
 
 def puzzle2(input_: str) -> int:
-    for i in range(14, len(input_.rstrip()) + 1):
-        if len(set(input_[i - 14:i])) == 14:
-            return i
+    return find_marker(input_, 14)
 
 
 if __name__ == "__main__":
@@ -2,10 +2,21 @@ from __future__ import annotations
 
 import abc
 import re
-from typing import Optional
+from array import array
+from bisect import bisect_left, bisect_right
+from fnmatch import fnmatchcase
+from itertools import accumulate
+from operator import itemgetter
+from typing import Iterator, Optional, ValuesView
+
+CD_PATTERN = re.compile(r"^\$ cd (?P<name>/|\.\.|[^\s]+)")
+DIR_PATTERN = re.compile(r"^dir (?P<name>[^\s]+)")
 
 
 class FSItem(metaclass=abc.ABCMeta):
+
+    __slots__ = ("name", "parent")
+
     def __init__(self, name: str, parent: Optional[FSItem] = None):
         self.name = name
         self.parent = parent
@@ -20,26 +31,40 @@ class FSItem(metaclass=abc.ABCMeta):
 
 
 class Dir(FSItem):
+
+    __slots__ = ("_children", "_size")
+
     def __init__(self, name: str, parent: Optional[FSItem] = None):
         super().__init__(name, parent)
-        self._children = []
+        self._children: dict[str, FSItem] = {}
+        self._size = 0
 
     @property
-    def children(self):
-        return self._children[:]
+    def children(self) -> ValuesView[FSItem]:
+        return self._children.values()
 
     @property
     def size(self):
-        result = 0
-        for child in self.children:
-            result += child.size
-        return result
+        return self._size
+
+    def get_child(self, name: str) -> Optional[FSItem]:
+        return self._children.get(name)
 
     def add_child(self, child: FSItem):
-        self._children.append(child)
+        self._children[child.name] = child
+        size = child.size
+        if not size:
+            return
+        dir_ = self
+        while dir_ is not None:
+            dir_._size += size
+            dir_ = dir_.parent
 
 
 class File(FSItem):
+
+    __slots__ = ("_size",)
+
     def __init__(self, name: str, size: int, parent: Optional[FSItem] = None):
         super().__init__(name, parent)
         self._size = size
@@ -55,15 +80,15 @@ def parse_input(input_: str) -> Dir:
 
     with open(input_, "r") as fp:
         for line in fp:
-            if match := re.match(r"^\$ cd (?P<name>/|\.\.|[^\s]+)", line):
+            if match := CD_PATTERN.match(line):
                 name = match.group("name")
                 if name == "/":
                     current = root
                 elif name == "..":
                     current = current.parent
                 else:
-                    dir_ = next(iter([c for c in current.children if isinstance(c, Dir) and c.name == name]), None)
-                    if not dir_:
+                    dir_ = current.get_child(name)
+                    if not isinstance(dir_, Dir):
                         dir_ = Dir(name=name, parent=current)
                         current.add_child(dir_)
                     current = dir_
@@ -72,27 +97,157 @@ def parse_input(input_: str) -> Dir:
                 continue
 
             else:
-                if match := re.match(r"^dir (?P<name>[^\s]+)", line):
-                    dir_ = next(
-                        iter(
-                            [
-                                c
-                                for c in current.children
-                                if isinstance(c, Dir)
-                                and c.name == match.group("name")
-                            ]
-                        ),
-                        None,
-                    )
-                    if not dir_:
-                        current.add_child(Dir(name=match.group("name"), parent=current))
+                if match := DIR_PATTERN.match(line):
+                    name = match.group("name")
+                    if not isinstance(current.get_child(name), Dir):
+                        current.add_child(Dir(name=name, parent=current))
                 else:
                     size, name = line.strip().split(" ")
-                    current.add_child(File(name=name, size=int(size), parent=current))
+                    if current.get_child(name) is None:
+                        current.add_child(File(name=name, size=int(size), parent=current))
 
     return root
 
 
+def iter_dir_sizes(input_: str) -> Iterator[tuple[str, int]]:
+    # Running totals are held for the current path only and each directory's total is
+    # emitted, once, as it is left. A repeated ls within one visit is ignored. Each frame
+    # also remembers which of its children were left, and entering one of them again
+    # raises, since its total has already been emitted.
+    names, totals, listed, left = ["/"], [0], [False], [set()]
+    counting = False
+
+    def path() -> str:
+        return "/" + "/".join(names[1:])
+
+    def leave() -> tuple[str, int]:
+        result = path(), totals.pop()
+        left.pop()
+        listed.pop()
+        totals[-1] += result[1]
+        left[-1].add(names.pop())
+        return result
+
+    with open(input_, "r") as fp:
+        for line in fp:
+            if match := CD_PATTERN.match(line):
+                counting = False
+                name = match.group("name")
+                if name == "/":
+                    while len(names) > 1:
+                        yield leave()
+                elif name == "..":
+                    if len(names) > 1:
+                        yield leave()
+                else:
+                    if name in left[-1]:
+                        raise ValueError(f"Directory revisited after its size was emitted: {path().rstrip('/')}/{name}")
+                    names.append(name)
+                    totals.append(0)
+                    listed.append(False)
+                    left.append(set())
+
+            elif line.startswith("$ ls"):
+                counting = not listed[-1]
+                listed[-1] = True
+
+            elif counting and line[0].isdigit():
+                totals[-1] += int(line.split(" ", 1)[0])
+
+    while len(names) > 1:
+        yield leave()
+    yield "/", totals[0]
+
+
+class FlatTree:
+
+    # Nodes are numbered in pre-order, so every parent index is lower than its
+    # children's and a single reverse sweep rolls file sizes up into directory totals.
+
+    @classmethod
+    def from_root(cls, root_: Dir) -> FlatTree:
+        parents, sizes, is_dir = array("q"), array("Q"), array("b")
+        stack = [(root_, -1)]
+        while stack:
+            item, parent = stack.pop()
+            index = len(parents)
+            parents.append(parent)
+            if isinstance(item, Dir):
+                sizes.append(0)
+                is_dir.append(1)
+                stack.extend((child, index) for child in item.children)
+            else:
+                sizes.append(item.size)
+                is_dir.append(0)
+        return cls(parents, sizes, is_dir)
+
+    def __init__(self, parents: array, sizes: array, is_dir: array):
+        self.parents = parents
+        self.sizes = array("Q", sizes)
+        self.is_dir = is_dir
+
+        for i in range(len(parents) - 1, 0, -1):
+            self.sizes[parents[i]] += self.sizes[i]
+
+        self._dir_sizes = sorted(size for size, dir_ in zip(self.sizes, is_dir) if dir_)
+        self._prefix_sums = [0, *accumulate(self._dir_sizes)]
+
+    @property
+    def total_size(self) -> int:
+        return self.sizes[0] if self.sizes else 0
+
+    def smallest_dir_at_least(self, size: int) -> Optional[int]:
+        i = bisect_left(self._dir_sizes, size)
+        return self._dir_sizes[i] if i < len(self._dir_sizes) else None
+
+    def sum_dirs_at_most(self, limit: int) -> int:
+        return self._prefix_sums[bisect_right(self._dir_sizes, limit)]
+
+    def smallest_dir_to_free(self, disk_size: int, required: int) -> Optional[int]:
+        return self.smallest_dir_at_least(required - (disk_size - self.total_size))
+
+
+class FSIndex:
+
+    # A snapshot of the tree taken by from_root: sizes are read once at build time and
+    # every query answers from them, so later add_child calls need a fresh index.
+
+    @classmethod
+    def from_root(cls, root_: Dir) -> FSIndex:
+        result = cls()
+        stack = [("/", root_)]
+        while stack:
+            path, item = stack.pop()
+            result._items[path] = item
+            result._sizes[path] = item.size
+            if isinstance(item, Dir):
+                result._dirs.append((path, item.size))
+                prefix = path.rstrip("/")
+                stack.extend((f"{prefix}/{child.name}", child) for child in item.children)
+        result._dirs.sort(key=itemgetter(1), reverse=True)
+        return result
+
+    def __init__(self):
+        self._items: dict[str, FSItem] = {}
+        self._sizes: dict[str, int] = {}
+        self._dirs: list[tuple[str, int]] = []
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._items
+
+    def get(self, path: str) -> Optional[FSItem]:
+        return self._items.get(path)
+
+    def size(self, path: str) -> Optional[int]:
+        return self._sizes.get(path)
+
+    def largest_dirs(self, n: int) -> list[tuple[str, int]]:
+        return self._dirs[:max(n, 0)]
+
+    def glob_dirs(self, pattern: str) -> list[tuple[str, int]]:
+        return [(path, size) for path, size in self._dirs if fnmatchcase(path, pattern)]
+
+
 def puzzle1(root_: Dir) -> int:
 
     def recurse(dir_: Dir) -> int:
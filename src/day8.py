@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import heapq
+import mmap
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from enum import auto
+from functools import cached_property
 from enum import IntEnum
-from typing import Optional
+from typing import Optional, Sequence
 
 
 class Tree:
@@ -40,9 +47,11 @@ class Tree:
             return self.grid[self.y + 1][self.x]
 
     def is_visible_from(self, direction: Direction) -> bool:
-        next_ = getattr(self, direction.name)
-        if next_:
-            return next_.height < self.height and next_.is_visible_from(direction)
+        current = self
+        while next_ := getattr(current, direction.name):
+            if next_.height >= current.height:
+                return False
+            current = next_
         return True
 
     @property
@@ -109,6 +118,334 @@ class Grid(list):
                 yield self[i][j]
 
 
+def viewing_distances(heights: Sequence[int]) -> list[int]:
+    # Distance from each tree back to the nearest earlier tree at least as tall,
+    # or to the edge. The stack holds the indices of trees not yet blocked.
+    result = []
+    stack = []
+    for i, height in enumerate(heights):
+        while stack and heights[stack[-1]] < height:
+            stack.pop()
+        result.append(i - stack[-1] if stack else i)
+        stack.append(i)
+    return result
+
+
+DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+
+class Heightmap:
+
+    @classmethod
+    def from_file(cls, filename: str) -> Heightmap:
+        with open(filename, "rb") as fp:
+            return cls([line.rstrip().translate(DIGITS) for line in fp if line.strip()])
+
+    def __init__(self, rows: list[bytes]):
+        self.rows = rows
+
+    @property
+    def width(self) -> int:
+        return len(self.rows[0]) if self.rows else 0
+
+    @property
+    def height(self) -> int:
+        return len(self.rows)
+
+    def row_visibility(self) -> list[bytearray]:
+        width = self.width
+        result = [bytearray(width) for __ in self.rows]
+
+        for row, visible in zip(self.rows, result):
+            highest = -1
+            for x in range(width):
+                if row[x] > highest:
+                    highest = row[x]
+                    visible[x] = 1
+            highest = -1
+            for x in range(width - 1, -1, -1):
+                if row[x] > highest:
+                    highest = row[x]
+                    visible[x] = 1
+
+        return result
+
+    def visibility(self) -> list[bytearray]:
+        width = self.width
+        result = self.row_visibility()
+
+        for rows in (range(self.height), range(self.height - 1, -1, -1)):
+            highest = [-1] * width
+            for y in rows:
+                row, visible = self.rows[y], result[y]
+                for x in range(width):
+                    if row[x] > highest[x]:
+                        highest[x] = row[x]
+                        visible[x] = 1
+
+        return result
+
+    def visible_count(self) -> int:
+        return sum(sum(visible) for visible in self.visibility())
+
+    @cached_property
+    def _scenic_scores(self) -> list[tuple[int, ...]]:
+        width = self.width
+        result = []
+        for row in self.rows:
+            left = viewing_distances(row)
+            right = viewing_distances(row[::-1])[::-1]
+            result.append([left[x] * right[x] for x in range(width)])
+
+        for x in range(width):
+            column = bytes(row[x] for row in self.rows)
+            up = viewing_distances(column)
+            down = viewing_distances(column[::-1])[::-1]
+            for y, scores in enumerate(result):
+                scores[x] *= up[y] * down[y]
+
+        return [tuple(scores) for scores in result]
+
+    @cached_property
+    def _ranked_scenic_scores(self) -> list[tuple[int, int, int]]:
+        return sorted(
+            (
+                (score, x, y)
+                for y, scores in enumerate(self._scenic_scores)
+                for x, score in enumerate(scores)
+            ),
+            reverse=True,
+        )
+
+    # The rows are immutable, so the score matrix is computed once and every query below
+    # answers from it.
+    def scenic_scores(self) -> list[tuple[int, ...]]:
+        return self._scenic_scores
+
+    def top_scenic_scores(self, k: int) -> list[tuple[int, int, int]]:
+        return self._ranked_scenic_scores[:max(k, 0)]
+
+    def max_scenic_score(self) -> int:
+        return max((max(scores) for scores in self._scenic_scores), default=0)
+
+
+class ForestModel:
+
+    # Per-direction visibility flags and viewing distances are kept for every tree. A
+    # height change only affects its own row (left/right) and column (up/down), so an
+    # update recomputes those two lines. Scenic scores sit in a lazily pruned max-heap.
+
+    def __init__(self, heightmap: Heightmap):
+        self.rows = [bytearray(row) for row in heightmap.rows]
+        self.width, self.height = heightmap.width, heightmap.height
+        self._visible_rows = [bytearray(self.width) for __ in self.rows]
+        self._visible_columns = [bytearray(self.width) for __ in self.rows]
+        self._row_distances = [[0] * self.width for __ in self.rows]
+        self._column_distances = [[0] * self.width for __ in self.rows]
+        self._scores = [[0] * self.width for __ in self.rows]
+        self._heap: list[tuple[int, int, int]] = []
+        self.visible_count = 0
+
+        for y in range(self.height):
+            self._refresh_row(y)
+        for x in range(self.width):
+            self._refresh_column(x)
+        for y in range(self.height):
+            for x in range(self.width):
+                self.visible_count += self._visible_rows[y][x] | self._visible_columns[y][x]
+                self._rescore(x, y)
+
+    @staticmethod
+    def _line_state(heights: Sequence[int]) -> tuple[list[int], list[int]]:
+        visible = [0] * len(heights)
+        for indices in (range(len(heights)), range(len(heights) - 1, -1, -1)):
+            highest = -1
+            for i in indices:
+                if heights[i] > highest:
+                    highest = heights[i]
+                    visible[i] = 1
+        before = viewing_distances(heights)
+        after = viewing_distances(heights[::-1])[::-1]
+        return visible, [b * a for b, a in zip(before, after)]
+
+    def _refresh_row(self, y: int) -> None:
+        visible, distances = self._line_state(self.rows[y])
+        self._visible_rows[y][:] = bytes(visible)
+        self._row_distances[y] = distances
+
+    def _refresh_column(self, x: int) -> None:
+        visible, distances = self._line_state([row[x] for row in self.rows])
+        for y in range(self.height):
+            self._visible_columns[y][x] = visible[y]
+            self._column_distances[y][x] = distances[y]
+
+    def _rescore(self, x: int, y: int) -> None:
+        score = self._row_distances[y][x] * self._column_distances[y][x]
+        self._scores[y][x] = score
+        heapq.heappush(self._heap, (-score, x, y))
+
+    def _visible(self, x: int, y: int) -> int:
+        return self._visible_rows[y][x] | self._visible_columns[y][x]
+
+    def set_height(self, x: int, y: int, height: int) -> None:
+        cells = [(i, y) for i in range(self.width)] + [(x, j) for j in range(self.height) if j != y]
+        self.visible_count -= sum(self._visible(i, j) for i, j in cells)
+
+        self.rows[y][x] = height
+        self._refresh_row(y)
+        self._refresh_column(x)
+
+        self.visible_count += sum(self._visible(i, j) for i, j in cells)
+        for i, j in cells:
+            self._rescore(i, j)
+
+        if len(self._heap) > 2 * self.width * self.height:
+            self._heap = [
+                (-score, i, j) for j, scores in enumerate(self._scores) for i, score in enumerate(scores)
+            ]
+            heapq.heapify(self._heap)
+
+    def scenic_score(self, x: int, y: int) -> int:
+        return self._scores[y][x]
+
+    def max_scenic_score(self) -> int:
+        while self._heap:
+            score, x, y = self._heap[0]
+            if -score == self._scores[y][x]:
+                return -score
+            heapq.heappop(self._heap)
+        return 0
+
+
+# Out-of-core solver. The grid is memory-mapped and split into bands of rows; rows are
+# independent left to right, and what a band needs from the rest of its columns is,
+# for every column and height h, the nearest row above and below holding a tree >= h.
+# Those tables hold width x HEIGHTS 32-bit row indices per band, so the parent keeps
+# about 80 / band_rows bytes per grid cell and at most MAX_PENDING bands are queued.
+HEIGHTS = 10
+BAND_ROWS = 1024
+MAX_PENDING = 2
+
+
+def _grid_shape(mm: mmap.mmap) -> tuple[int, int]:
+    width = mm.find(b"\n")
+    if width == -1:
+        return len(mm), 1
+    return width, (len(mm) + 1) // (width + 1)
+
+
+def _read_rows(filename: str, start: int, stop: int) -> tuple[list[bytes], int, int]:
+    with open(filename, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            width, height = _grid_shape(mm)
+            stride = width + 1
+            rows = [mm[y * stride:y * stride + width].translate(DIGITS) for y in range(start, stop)]
+    return rows, width, height
+
+
+def _band_edges(filename: str, start: int, stop: int) -> tuple[array, array]:
+    rows, width, __ = _read_rows(filename, start, stop)
+    first = array("i", [-1]) * (width * HEIGHTS)
+    last = array("i", [-1]) * (width * HEIGHTS)
+    for y, row in enumerate(rows, start=start):
+        for x, height in enumerate(row):
+            for i in range(x * HEIGHTS, x * HEIGHTS + height + 1):
+                if first[i] == -1:
+                    first[i] = y
+                last[i] = y
+    return first, last
+
+
+def _column_distances(
+    rows: list[bytes], ys: range, blockers: array, edge: int
+) -> tuple[list[list[int]], list[bytearray]]:
+    # Sweeps the band along ``ys`` carrying, per column and height, the nearest row
+    # seen so far holding a tree at least that tall.
+    blockers = array("i", blockers)
+    offset = ys.start if ys.step > 0 else ys.stop + 1
+    distances, visible = [], []
+    for y in ys:
+        row_distances, row_visible = [], bytearray(len(rows[0]))
+        for x, height in enumerate(rows[y - offset]):
+            i = x * HEIGHTS
+            blocker = blockers[i + height]
+            if blocker == -1:
+                row_distances.append(abs(y - edge))
+                row_visible[x] = 1
+            else:
+                row_distances.append(abs(y - blocker))
+            for j in range(i, i + height + 1):
+                blockers[j] = y
+        distances.append(row_distances)
+        visible.append(row_visible)
+    if ys.step < 0:
+        distances.reverse()
+        visible.reverse()
+    return distances, visible
+
+
+def _band_results(filename: str, start: int, stop: int, above: array, below: array) -> tuple[int, int]:
+    rows, width, height = _read_rows(filename, start, stop)
+    band = Heightmap(rows)
+    ups, visible_up = _column_distances(rows, range(start, stop), above, 0)
+    downs, visible_down = _column_distances(rows, range(stop - 1, start - 1, -1), below, height - 1)
+
+    visible, best = 0, 0
+    rows_visible = zip(band.row_visibility(), visible_up, visible_down)
+    for y, (visible_row, visible_up_row, visible_down_row) in enumerate(rows_visible):
+        left = viewing_distances(rows[y])
+        right = viewing_distances(rows[y][::-1])[::-1]
+        for x in range(width):
+            visible += visible_row[x] | visible_up_row[x] | visible_down_row[x]
+            best = max(best, left[x] * right[x] * ups[y][x] * downs[y][x])
+    return visible, best
+
+
+def _merge_edges(base: array, edge: array) -> array:
+    # Rows recorded in ``edge`` are nearer than those in ``base`` wherever it has one.
+    result = array("i", base)
+    for i, value in enumerate(edge):
+        if value != -1:
+            result[i] = value
+    return result
+
+
+def solve_tiled(
+    filename: str, band_rows: int = BAND_ROWS, workers: Optional[int] = None
+) -> tuple[int, int]:
+    with open(filename, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            width, height = _grid_shape(mm)
+    bands = [(start, min(start + band_rows, height)) for start in range(0, height, band_rows)]
+    empty = array("i", [-1]) * (width * HEIGHTS)
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Edges arrive in band order: fold the last-row tables straight into each band's
+        # above table and keep only the first-row tables for the upward scan.
+        aboves, firsts = [], []
+        above = empty
+        for first, last in executor.map(_band_edges, *zip(*((filename, *band) for band in bands))):
+            aboves.append(above)
+            firsts.append(first)
+            above = _merge_edges(above, last)
+
+        visible, best = 0, 0
+        pending = deque()
+        below = empty
+        for i in range(len(bands) - 1, -1, -1):
+            start, stop = bands[i]
+            pending.append(executor.submit(_band_results, filename, start, stop, aboves[i], below))
+            below = _merge_edges(below, firsts[i])
+            aboves[i] = firsts[i] = None
+            while len(pending) > MAX_PENDING * workers or (pending and not i):
+                band_visible, band_best = pending.popleft().result()
+                visible += band_visible
+                best = max(best, band_best)
+
+    return visible, best
+
+
 def parse_input(input_: str) -> Grid:
     result = Grid()
     with open(input_, "r") as fp:
@@ -124,11 +461,7 @@ def puzzle1(grid: Grid) -> int:
 
 
 def puzzle2(grid: Grid) -> int:
-    highest_scenic_score = grid[0][0]
-    for tree in grid:
-        if tree.scenic_score > highest_scenic_score.scenic_score:
-            highest_scenic_score = tree
-    return highest_scenic_score.scenic_score
+    return max(tree.scenic_score for tree in grid)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,8 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
 from enum import Enum
-from functools import cache
-from typing import Iterator, Union
+from typing import Iterator, Optional, Union
 
 
 class Direction(Enum):
@@ -24,7 +24,6 @@ class Vector:
         return hash((self.x, self.y))
 
     @property
-    @cache
     def magnitude(self) -> float:
         return (self.x ** 2 + self.y ** 2) ** .5
 
@@ -66,7 +65,217 @@ class Simulation:
                 self.tail += vector.normal
                 if self.head.x != self.tail.x:
                     self.tail.x = self.head.x
-            self._tail_visited.add(self.tail)
+            self._tail_visited.add(Vector(self.tail.x, self.tail.y))
+
+
+def parse_moves(filename: str) -> Iterator[tuple[int, int, int]]:
+    with open(filename, "r") as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            direction, count = line.split()
+            yield (*Direction[direction].value, int(count))
+
+
+class PackedVisited:
+
+    # Cells are stored as single integer keys: x and y each offset into an unsigned
+    # 32-bit field, so keys fit in 64 bits. The first cell outside that range rekeys the
+    # set with 64-bit fields, as wide as the int64 knot arrays, so keys never collide.
+
+    def __init__(self):
+        self._keys: set[int] = set()
+        self._set_width(32)
+
+    def _set_width(self, bits: int):
+        self.bits = bits
+        self._offset = 1 << (bits - 1)
+        self._mask = (1 << bits) - 1
+
+    def _widen(self):
+        if self.bits == 64:
+            return
+        cells = list(self)
+        self._set_width(64)
+        self._keys = {self._key(x, y) for x, y in cells}
+
+    def _key(self, x: int, y: int) -> int:
+        return (x + self._offset) << self.bits | (y + self._offset)
+
+    def _fits(self, x: int, y: int) -> bool:
+        return -self._offset <= x < self._offset and -self._offset <= y < self._offset
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for key in self._keys:
+            yield (key >> self.bits) - self._offset, (key & self._mask) - self._offset
+
+    def add(self, x: int, y: int):
+        if not self._fits(x, y):
+            self._widen()
+        self._keys.add(self._key(x, y))
+
+    def add_run(self, x: int, y: int, dx: int, dy: int, count: int):
+        if not (self._fits(x, y) and self._fits(x + dx * (count - 1), y + dy * (count - 1))):
+            self._widen()
+        # A straight run of cells is an arithmetic progression of keys.
+        start = self._key(x, y)
+        step = (dx << self.bits) + dy
+        self._keys.update(range(start, start + step * count, step))
+
+
+class BoundsVisited:
+
+    def __init__(self):
+        self.min_x = self.min_y = self.max_x = self.max_y = 0
+        # Upper bound on distinct cells visited: every recorded tail position counts.
+        self.cells = 0
+
+    @property
+    def area(self) -> int:
+        return (self.max_x - self.min_x + 1) * (self.max_y - self.min_y + 1)
+
+    def add(self, x: int, y: int):
+        self.cells += 1
+        if x < self.min_x:
+            self.min_x = x
+        elif x > self.max_x:
+            self.max_x = x
+        if y < self.min_y:
+            self.min_y = y
+        elif y > self.max_y:
+            self.max_y = y
+
+    def add_run(self, x: int, y: int, dx: int, dy: int, count: int):
+        self.add(x, y)
+        self.add(x + dx * (count - 1), y + dy * (count - 1))
+        self.cells += count - 2
+
+
+class BitmapVisited:
+
+    # A packed key in its set measures about 70 bytes per visited cell, so the bitmap
+    # pays off while the bounding box has at most 512 cells per visited cell. The first
+    # pass only gives an upper bound on visited cells, which errs towards the bitmap.
+    MAX_BITS_PER_CELL = 512
+
+    @classmethod
+    def fits(cls, bounds: BoundsVisited) -> bool:
+        return bounds.area <= cls.MAX_BITS_PER_CELL * bounds.cells
+
+    def __init__(self, bounds: BoundsVisited):
+        self.min_x, self.min_y = bounds.min_x, bounds.min_y
+        self.width = bounds.max_x - bounds.min_x + 1
+        self.height = bounds.max_y - bounds.min_y + 1
+        self._bits = bytearray((self.width * self.height + 7) // 8)
+
+    def __len__(self) -> int:
+        return int.from_bytes(self._bits, "little").bit_count()
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for i in range(self.width * self.height):
+            if self._bits[i >> 3] >> (i & 7) & 1:
+                yield self.min_x + i % self.width, self.min_y + i // self.width
+
+    def add(self, x: int, y: int):
+        i = (y - self.min_y) * self.width + (x - self.min_x)
+        self._bits[i >> 3] |= 1 << (i & 7)
+
+    def _set_bit_range(self, start: int, stop: int):
+        bits = self._bits
+        first, last = start >> 3, (stop - 1) >> 3
+        if first == last:
+            bits[first] |= (0xFF << (start & 7)) & (0xFF >> (7 - ((stop - 1) & 7)))
+            return
+        bits[first] |= (0xFF << (start & 7)) & 0xFF
+        bits[first + 1:last] = b"\xff" * (last - first - 1)
+        bits[last] |= 0xFF >> (7 - ((stop - 1) & 7))
+
+    def add_run(self, x: int, y: int, dx: int, dy: int, count: int):
+        # Start from the lower end so the run's bit indices ascend.
+        if dx < 0 or dy < 0:
+            x, y = x + dx * (count - 1), y + dy * (count - 1)
+        i = (y - self.min_y) * self.width + (x - self.min_x)
+        if not dy:
+            self._set_bit_range(i, i + count)
+            return
+        for i in range(i, i + self.width * count, self.width):
+            self._bits[i >> 3] |= 1 << (i & 7)
+
+
+Visited = Union[PackedVisited, BoundsVisited, BitmapVisited]
+
+
+class Rope:
+
+    def __init__(self, knots: int = 2, visited: Optional[Visited] = None):
+        self.xs = array("q", [0]) * knots
+        self.ys = array("q", [0]) * knots
+
+        self._tail_visited = visited if visited is not None else PackedVisited()
+        self._tail_visited.add(0, 0)
+
+    @property
+    def tail_visited(self) -> list[tuple[int, int]]:
+        return list(self._tail_visited)
+
+    @property
+    def tail_visited_count(self) -> int:
+        return len(self._tail_visited)
+
+    def step(self, dx: int, dy: int):
+        xs, ys = self.xs, self.ys
+        xs[0] += dx
+        ys[0] += dy
+        for i in range(1, len(xs)):
+            ddx, ddy = xs[i - 1] - xs[i], ys[i - 1] - ys[i]
+            if -1 <= ddx <= 1 and -1 <= ddy <= 1:
+                return
+            xs[i] += (ddx > 0) - (ddx < 0)
+            ys[i] += (ddy > 0) - (ddy < 0)
+        self._tail_visited.add(xs[-1], ys[-1])
+
+    def is_stretched(self, dx: int, dy: int) -> bool:
+        xs, ys = self.xs, self.ys
+        return all(xs[i] == xs[i - 1] - dx and ys[i] == ys[i - 1] - dy for i in range(1, len(xs)))
+
+    def move(self, dx: int, dy: int, count: int):
+        while count:
+            self.step(dx, dy)
+            count -= 1
+            if count and self.is_stretched(dx, dy):
+                break
+
+        if not count:
+            return
+
+        # Fully stretched behind the head: every knot translates for the rest of the run.
+        xs, ys = self.xs, self.ys
+        for i in range(len(xs)):
+            xs[i] += dx * count
+            ys[i] += dy * count
+        self._tail_visited.add_run(xs[-1] - dx * (count - 1), ys[-1] - dy * (count - 1), dx, dy, count)
+
+
+def simulate(filename: str, knots: int, dense: bool = False) -> int:
+    # In dense mode a first pass only measures the tail's bounding box, and the second
+    # records visited cells in a bitmap of one bit per cell inside it, unless that bitmap
+    # would be larger than the packed keys.
+    visited = None
+    if dense:
+        bounds = BoundsVisited()
+        rope = Rope(knots, visited=bounds)
+        for dx, dy, count in parse_moves(filename):
+            rope.move(dx, dy, count)
+        if BitmapVisited.fits(bounds):
+            visited = BitmapVisited(bounds)
+
+    rope = Rope(knots, visited=visited)
+    for dx, dy, count in parse_moves(filename):
+        rope.move(dx, dy, count)
+    return rope.tail_visited_count
 
 
 def puzzle1(filename: str):
@@ -76,6 +285,11 @@ def puzzle1(filename: str):
     print(len(sim.tail_visited))
 
 
+def puzzle2(filename: str) -> int:
+    return simulate(filename, knots=10)
+
+
 if __name__ == "__main__":
     puzzle1("../input/day9.txt")
+    print(puzzle2("../input/day9.txt"))
 